@@ -0,0 +1,235 @@
+"""
+Configuration loading, Langflow API access and response formatting for the chatbot.
+Kept out of streamlit_app.py so it is imported once per process rather than re-executed on every rerun.
+"""
+import os
+import hashlib
+import html
+import logging
+import streamlit as st
+import httpx
+import orjson
+import re
+import threading
+from functools import lru_cache
+from typing import Iterator
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# For local development, load environment variables from the .env file.
+# In Streamlit Cloud, st.secrets will be available, so skip importing dotenv when there is no .env.
+DOTENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+if os.path.exists(DOTENV_PATH):
+    from dotenv import load_dotenv
+    load_dotenv(DOTENV_PATH)
+
+@lru_cache(maxsize=None)
+def get_config_value(key: str) -> str:
+    """
+    Retrieve configuration value from st.secrets (if available)
+    or fallback to environment variables.
+    """
+    # Check for a secrets file first: reading st.secrets without one shows an error on the page.
+    if st.secrets.load_if_toml_exists() and key in st.secrets:
+        return st.secrets[key]
+    return os.getenv(key)
+
+# --------------------------
+# 1. Configuration Constants
+#    Retrieve settings and sensitive data from st.secrets or environment variables.
+# --------------------------
+# APPLICATION_TOKEN must be set in st.secrets or the .env file.
+BASE_API_URL, LANGFLOW_ID, FLOW_ID, APPLICATION_TOKEN = (
+    get_config_value(key) for key in ("BASE_API_URL", "LANGFLOW_ID", "FLOW_ID", "APPLICATION_TOKEN")
+)
+
+if not APPLICATION_TOKEN:
+    raise ValueError("APPLICATION_TOKEN not set. Please set it in your Streamlit secrets or .env file.")
+
+# Endpoint and headers are fixed for the process lifetime, so build them once.
+ENDPOINT = f"{BASE_API_URL}/lf/{LANGFLOW_ID}/api/v1/run/{FLOW_ID}"
+HEADERS = {
+    "Authorization": f"Bearer {APPLICATION_TOKEN}",
+    "Content-Type": "application/json"
+}
+
+# 3s connect / 45s read timeouts, so a hung API call can't hold the session worker indefinitely.
+REQUEST_TIMEOUT = httpx.Timeout(45, connect=3.05)
+
+# Short fingerprint of the token, used as a cache key so rotating it invalidates cached answers.
+TOKEN_HASH = hashlib.blake2b(APPLICATION_TOKEN.encode(), digest_size=8).hexdigest()
+
+# --------------------------
+# 2. Function to Run the Langflow Flow
+#    This function sends the user's message to the Langflow API and returns the bot's response.
+# --------------------------
+@st.cache_resource
+def get_client() -> httpx.Client:
+    """
+    Returns a shared HTTP/2 httpx.Client so connections to the Langflow API are
+    reused (and multiplexed) across reruns instead of re-handshaking each time.
+    """
+    transport = httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+        # Retries only cover failed connection attempts, before anything was sent.
+        retries=2,
+    )
+    return httpx.Client(headers=HEADERS, timeout=REQUEST_TIMEOUT, transport=transport)
+
+@st.cache_resource
+def get_answer_cache() -> tuple:
+    """
+    Returns a process-wide TTL cache of completed answers and the lock guarding it.
+    Streamed answers can't go through st.cache_data, so they are stored here once finished.
+    """
+    return TTLCache(maxsize=256, ttl=3600), threading.Lock()
+
+class FlowError(Exception):
+    """
+    Raised when the Langflow API call fails or returns an unexpected response.
+    Carries the decoded response (if any) so the caller can display it.
+    """
+    def __init__(self, message: str, data=None):
+        super().__init__(message)
+        self.data = data
+
+def _extract_text(data: dict) -> str:
+    """
+    Pulls the LLM's answer out of a decoded Langflow run response.
+    """
+    # Happy path: the standard Langflow run response.
+    try:
+        text = data["outputs"][0]["outputs"][0]["results"]["message"]["data"]["text"]
+        if text and isinstance(text, str):
+            return text
+    except (KeyError, IndexError, TypeError):
+        pass
+    # Fall back to a top-level key, then to the text stored directly on the message.
+    if isinstance(data, dict):
+        for key in ("Text", "text"):
+            text = data.get(key)
+            if text and isinstance(text, str):
+                return text
+    try:
+        text = data["outputs"][0]["outputs"][0]["results"]["message"]["text"]
+        if text and isinstance(text, str):
+            return text
+    except (KeyError, IndexError, TypeError):
+        pass
+
+    raise FlowError("Error: Unexpected API response structure. Enable \"Debug API response\" in the sidebar to inspect it.", data)
+
+def _decode_json(raw: bytes | str):
+    """
+    Decodes a JSON response body or stream line, raising FlowError with the raw text if it isn't JSON.
+    """
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        text = raw.decode(errors="replace") if isinstance(raw, bytes) else raw
+        raise FlowError("Error: The API returned a response that isn't valid JSON. Enable \"Debug API response\" in the sidebar to inspect it.", text) from e
+
+def _read_response(response: httpx.Response) -> Iterator[str]:
+    """
+    Yields the LLM's response from a Langflow run response, token by token when streamed.
+    """
+    if response.status_code != 200:
+        response.read()
+        raise FlowError(f"Error: {response.status_code} - {response.text}")
+
+    # Deployments that don't support streaming answer with a regular body, which is
+    # decoded as a whole so a non-JSON reply (e.g. an HTML login page) is reported in full.
+    if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+        yield _extract_text(_decode_json(response.read()))
+        return
+
+    # Otherwise the body is a sequence of JSON events separated by blank lines.
+    streamed = False
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = _decode_json(line)
+        if not isinstance(event, dict):
+            raise FlowError("Error: Unexpected API response structure. Enable \"Debug API response\" in the sidebar to inspect it.", event)
+        data = event.get("data")
+        if not isinstance(data, dict):
+            data = {}
+        if event.get("event") == "token":
+            chunk = data.get("chunk")
+            if chunk and isinstance(chunk, str):
+                streamed = True
+                yield chunk
+        elif event.get("event") == "error":
+            raise FlowError(f"Error: {data.get('error', 'Langflow reported an error while streaming.')}")
+        elif event.get("event") == "end":
+            # Flows whose model doesn't stream only deliver the answer in the final result.
+            if not streamed:
+                yield _extract_text(data.get("result") or {})
+            return
+
+    # Without an "end" event the answer may be truncated, so it must not be returned (or cached).
+    raise FlowError("Error: The API response stream ended before the answer was complete.")
+
+def _stream_flow(user_message: str, endpoint: str) -> Iterator[str]:
+    """
+    Sends the user's message to the Langflow flow and yields the LLM's response as it is generated.
+    Raises FlowError on failure so that errors are never cached.
+    """
+    # Serialize with orjson up front; the client already sends the JSON Content-Type header.
+    body = orjson.dumps({
+        "input_value": user_message,
+        "output_type": "chat",
+        "input_type": "chat"
+    })
+
+    try:
+        with get_client().stream("POST", endpoint, params={"stream": "true"}, content=body) as response:
+            yield from _read_response(response)
+    except httpx.RequestError as e:
+        logger.warning("Langflow request to %s failed: %s", endpoint, e)
+        raise FlowError("Error: The backend is slow or unreachable, please retry.") from e
+
+def run_flow(user_message: str) -> Iterator[str]:
+    """
+    Yields the LLM's response for the user's message as it arrives.
+    Repeated prompts are answered from the cache in a single chunk.
+    """
+    cache, lock = get_answer_cache()
+    key = (user_message, ENDPOINT, TOKEN_HASH)
+    with lock:
+        cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    for chunk in _stream_flow(user_message, ENDPOINT):
+        chunks.append(chunk)
+        yield chunk
+    with lock:
+        cache[key] = "".join(chunks)
+
+# --------------------------
+# 3. Highlighting of <think> Blocks
+#    Splits bot responses so the model's reasoning can be styled separately.
+# --------------------------
+# Compiled once at import rather than on every call.
+_THINK_RE = re.compile(r'<think>(.*?)</think>', re.DOTALL)
+_THINK_HTML = '<div style="background-color: #444; color: #fff; padding: 5px; border-radius: 5px;">{}</div>'
+
+def highlight_think(text: str) -> list:
+    """
+    Splits a bot response into (is_html, text) parts. Text between <think> and </think> tags
+    is escaped and wrapped in a styled div with a dark gray background and white text; the rest
+    stays plain markdown so it can be rendered without unsafe_allow_html.
+    """
+    parts = []
+    # With one capture group, re.split alternates outside/inside <think> blocks.
+    for i, part in enumerate(_THINK_RE.split(text)):
+        if i % 2:
+            parts.append((True, _THINK_HTML.format(html.escape(part))))
+        elif part and not part.isspace():
+            parts.append((False, part))
+    return parts
@@ -1,100 +1,33 @@
-import os
+import time
 import streamlit as st
-import requests
-import json
-import re
-from dotenv import load_dotenv
-
-# For local development, load environment variables from the .env file.
-# In Streamlit Cloud, st.secrets will be available.
-load_dotenv()
-
-def get_config_value(key: str) -> str:
-    """
-    Retrieve configuration value from st.secrets (if available)
-    or fallback to environment variables.
-    """
-    return st.secrets.get(key, os.getenv(key))
+from chatbot.core import FlowError, highlight_think, run_flow
 
 # --------------------------
-# 1. Configuration Constants
-#    Retrieve settings and sensitive data from environment variables.
+# Streamlit UI Interface
+# Provides a simple user interface to send messages and display the chatbot response.
 # --------------------------
-BASE_API_URL = os.getenv("BASE_API_URL")
-LANGFLOW_ID = os.getenv("LANGFLOW_ID")
-FLOW_ID = os.getenv("FLOW_ID")
-APPLICATION_TOKEN = os.getenv("APPLICATION_TOKEN")  # Must be set in the .env file
-
-if not APPLICATION_TOKEN:
-    raise ValueError("APPLICATION_TOKEN environment variable not set. Please set it in your .env file.")
-
-# --------------------------
-# 2. Function to Run the Langflow Flow
-#    This function sends the user's message to the Langflow API and returns the bot's response.
-# --------------------------
-def run_flow(user_message: str) -> str:
-    """
-    Sends the user's message to the Langflow flow and returns the LLM's response.
-    """
-    endpoint = f"{BASE_API_URL}/lf/{LANGFLOW_ID}/api/v1/run/{FLOW_ID}"
-    headers = {
-        "Authorization": f"Bearer {APPLICATION_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "input_value": user_message,
-        "output_type": "chat",
-        "input_type": "chat"
-    }
-
-    response = requests.post(endpoint, json=payload, headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        # First, check for a top-level key.
-        output = data.get("Text") or data.get("text")
-        if output:
-            return output
-        # If not found, try to extract from the nested structure.
-        outputs = data.get("outputs")
-        if outputs and isinstance(outputs, list) and len(outputs) > 0:
-            nested_outputs = outputs[0].get("outputs")
-            if nested_outputs and isinstance(nested_outputs, list) and len(nested_outputs) > 0:
-                results = nested_outputs[0].get("results", {})
-                message = results.get("message", {})
-                # Check if the text is in the "data" sub-dictionary.
-                if "data" in message and isinstance(message["data"], dict):
-                    text = message["data"].get("text")
-                    if text:
-                        return text
-                # Fallback to check directly in message.
-                if message.get("text"):
-                    return message.get("text")
+# Number of user/bot exchanges kept in the conversation history.
+MAX_TURNS = 50
 
-        st.error("No output found. API response structure is unexpected:")
-        st.json(data)
-        return "Error: Unexpected API response structure. Please check the debug output above."
-    else:
-        error_msg = f"Error: {response.status_code} - {response.text}"
-        st.error(error_msg)
-        return error_msg
+# While streaming, the partial answer is redrawn at most this often (or when a <think> block closes),
+# since every redraw re-highlights the whole answer so far.
+STREAM_RENDER_CHARS = 200
+STREAM_RENDER_SECONDS = 0.1
 
-# --------------------------
-# 3. Streamlit UI Interface
-#    Provides a simple user interface to send messages and display the chatbot response.
-# --------------------------
-def highlight_think(text: str) -> str:
+def render_bot_text(parts: list) -> None:
     """
-    Wraps any text between <think> and </think> tags in a styled div
-    with a dark gray background and white text.
+    Renders the parts produced by highlight_think; only the escaped <think> blocks need raw HTML.
     """
-    pattern = re.compile(r'(<think>)(.*?)(</think>)', re.DOTALL)
-    highlighted = pattern.sub(r'<div style="background-color: #444; color: #fff; padding: 5px; border-radius: 5px;">\2</div>', text)
-    return highlighted
+    for is_html, part in parts:
+        st.markdown(part, unsafe_allow_html=is_html)
 
 def main():
     # Initialize conversation history in session state if not already set.
     if "history" not in st.session_state:
         st.session_state.history = []
+
+    # Raw API responses are only rendered when explicitly requested.
+    st.sidebar.checkbox("Debug API response", key="debug")
     
     # Custom header with two centered lines.
     st.markdown(
@@ -118,30 +51,67 @@ def main():
     
     # Display conversation history.
     for chat in st.session_state.history:
-        if chat["role"] == "user":
-            st.markdown(f"**You:** {chat['text']}")
-        elif chat["role"] == "bot":
-            # Highlight any <think> blocks in the bot response.
-            bot_text = highlight_think(chat["text"])
-            st.markdown(f"**Bot:** {bot_text}", unsafe_allow_html=True)
+        with st.chat_message(chat["role"]):
+            if chat["role"] == "user":
+                st.markdown(chat["text"])
+            else:
+                # <think> blocks were already highlighted when the turn was appended.
+                render_bot_text(chat["parts"])
 
-    # Multi-line text area for long messages.
-    user_input = st.text_area("Enter your message:", height=150)
-    
-    # When the "Send" button is clicked, process the input.
-    if st.button("Send"):
-        if user_input.strip():
+    # Process a submitted message below the history; st.chat_input clears itself afterwards.
+    user_input = st.chat_input("Enter your message:")
+    if user_input is not None:
+        if user_input and not user_input.isspace():
             # Append user message to conversation history.
             st.session_state.history.append({"role": "user", "text": user_input})
+            with st.chat_message("user"):
+                st.markdown(user_input)
             
-            # Get bot response.
-            answer = run_flow(user_input)
-            st.session_state.history.append({"role": "bot", "text": answer})
-            
-            # Clear the text area after processing.
-            st.experimental_rerun()
+            # Get bot response, showing it as it streams in; it moves into the history once complete.
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                chunks = []
+                unrendered = 0
+                last_render = time.monotonic()
+                try:
+                    for chunk in run_flow(user_input):
+                        chunks.append(chunk)
+                        unrendered += len(chunk)
+                        if (unrendered >= STREAM_RENDER_CHARS or "</think>" in chunk
+                                or time.monotonic() - last_render >= STREAM_RENDER_SECONDS):
+                            with placeholder.container():
+                                render_bot_text(highlight_think("".join(chunks)))
+                            unrendered = 0
+                            last_render = time.monotonic()
+                    answer = "".join(chunks)
+                    # Highlight any <think> blocks once, so reruns don't redo it for every turn.
+                    parts = highlight_think(answer)
+                    with placeholder.container():
+                        render_bot_text(parts)
+                except FlowError as e:
+                    placeholder.empty()
+                    answer = str(e)
+                    parts = highlight_think(answer)
+                    st.error(answer)
+                    # Kept in session state so it can still be inspected after ticking the debug checkbox.
+                    st.session_state.last_error_data = e.data
+                else:
+                    st.session_state.last_error_data = None
+            st.session_state.history.append({"role": "assistant", "text": answer, "parts": parts})
+            # Keep only the most recent turns so each rerun renders a bounded history.
+            del st.session_state.history[:-2 * MAX_TURNS]
         else:
             st.warning("Please enter a message first.")
 
+    # Show the response behind the last failed request when debugging is enabled.
+    last_error_data = st.session_state.get("last_error_data")
+    if last_error_data is not None and st.session_state.get("debug"):
+        st.markdown("**Last unexpected API response:**")
+        # Bodies that aren't JSON are kept as raw text.
+        if isinstance(last_error_data, str):
+            st.code(last_error_data)
+        else:
+            st.json(last_error_data)
+
 if __name__ == "__main__":
     main()
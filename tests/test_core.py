@@ -0,0 +1,91 @@
+import os
+
+import httpx
+import orjson
+import pytest
+
+# chatbot.core reads its settings at import time.
+os.environ.setdefault("APPLICATION_TOKEN", "test-token")
+os.environ.setdefault("BASE_API_URL", "https://langflow.test")
+os.environ.setdefault("LANGFLOW_ID", "langflow-id")
+os.environ.setdefault("FLOW_ID", "flow-id")
+
+from chatbot.core import FlowError, _extract_text, _read_response, highlight_think
+
+
+def event_stream(*events) -> httpx.Response:
+    content = b"".join(orjson.dumps(event) + b"\n\n" for event in events)
+    return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=content)
+
+
+def test_complete_stream_yields_tokens():
+    response = event_stream(
+        {"event": "token", "data": {"chunk": "Hel"}},
+        {"event": "token", "data": {"chunk": "lo"}},
+        {"event": "end", "data": {"result": {}}},
+    )
+    assert list(_read_response(response)) == ["Hel", "lo"]
+
+
+def test_truncated_stream_raises():
+    response = event_stream({"event": "token", "data": {"chunk": "Partial ans"}})
+    with pytest.raises(FlowError):
+        list(_read_response(response))
+
+
+def test_non_json_body_raises_with_raw_text():
+    response = httpx.Response(200, headers={"Content-Type": "text/html"}, content=b"<html>Sign in</html>")
+    with pytest.raises(FlowError) as excinfo:
+        list(_read_response(response))
+    assert excinfo.value.data == "<html>Sign in</html>"
+
+
+def test_multiline_non_json_body_keeps_full_text():
+    body = b"<html>\n<body>Sign in</body>\n</html>"
+    response = httpx.Response(200, headers={"Content-Type": "text/html"}, content=body)
+    with pytest.raises(FlowError) as excinfo:
+        list(_read_response(response))
+    assert excinfo.value.data == body.decode()
+
+
+def test_non_dict_event_raises():
+    response = event_stream(["not", "an", "event"])
+    with pytest.raises(FlowError):
+        list(_read_response(response))
+
+
+def run_response(message: dict) -> dict:
+    return {"outputs": [{"outputs": [{"results": {"message": message}}]}]}
+
+
+def test_extract_text_happy_path():
+    assert _extract_text(run_response({"data": {"text": "nested"}, "text": "direct"})) == "nested"
+
+
+def test_extract_text_fallback_order():
+    assert _extract_text({"Text": "upper", "text": "lower", **run_response({"text": "direct"})}) == "upper"
+    assert _extract_text({"text": "lower", **run_response({"text": "direct"})}) == "lower"
+    assert _extract_text(run_response({"data": {}, "text": "direct"})) == "direct"
+
+
+def test_extract_text_rejects_non_string_values():
+    with pytest.raises(FlowError):
+        _extract_text({"text": {"a": 1}})
+    with pytest.raises(FlowError):
+        _extract_text(run_response({"data": {"text": ["a"]}, "text": 1}))
+
+
+def test_highlight_think_keeps_html_outside_think_as_markdown():
+    parts = highlight_think("<think>hmm</think>Answer <script>alert(1)</script>")
+    assert parts[-1] == (False, "Answer <script>alert(1)</script>")
+
+
+def test_highlight_think_escapes_html_inside_think():
+    [(is_html, part)] = highlight_think("<think><img src=x onerror=alert(1)></think>")
+    assert is_html
+    assert "<img" not in part
+    assert "&lt;img src=x onerror=alert(1)&gt;" in part
+
+
+def test_highlight_think_leaves_unclosed_think_as_markdown():
+    assert highlight_think("<think>still reasoning <b>") == [(False, "<think>still reasoning <b>")]